@@ -216,12 +216,9 @@ function test-mtls-ssl-client-server-comm-pytest() {
     cd pytests
 
     # ----
-    # Exercise client-server communication with self-signed certificates
-    pytest --capture=tee-sys -v test_client_server_mtls.py -k test_server_process_with_mtls_self_signed_cert &
-
-    sleep 5
-
-    pytest --capture=tee-sys -v test_client_server_mtls.py -k test_client_app_with_mtls_self_signed_cert
+    # Exercise client-server communication with self-signed certificates.
+    # Server and client run concurrently, in separate threads, in each test.
+    pytest --capture=tee-sys -v test_client_server_mtls.py -k test_mtls_self_signed
 
     # ----
     # Basic test to exercise core certificate verification v/s root-CA-cert
@@ -229,25 +226,14 @@ function test-mtls-ssl-client-server-comm-pytest() {
 
     # ----
     # Exercise client-server communication with root-CA-signed certificates
-    pytest --capture=tee-sys -v test_client_server_mtls.py \
-            -k test_server_process_with_mtls_root_signed_cert_and_pvt_key_file &
-
-    sleep 5
-
-    pytest --capture=tee-sys -v test_client_server_mtls.py \
-            -k test_client_app_with_mtls_root_signed_cert_and_pvt_key_file
+    pytest --capture=tee-sys -v test_client_server_mtls.py -k "test_mtls_root_signed and not temp_pvt_key_file"
 
     # ----
     # Exercise client-server communication with root-CA-signed certificates
     # using private-key written-to and read-from a temp-file, for certificate
     # verification.
     pytest --capture=tee-sys -v test_client_server_mtls.py \
-            -k test_server_process_with_mtls_root_signed_cert_using_temp_pvt_key_file &
-
-    sleep 5
-
-    pytest --capture=tee-sys -v test_client_server_mtls.py \
-            -k test_client_app_with_mtls_root_signed_cert_using_temp_pvt_key_file
+            -k test_mtls_root_signed_using_temp_pvt_key_file
 
     popd > /dev/null 2>&1
 }
@@ -27,8 +27,14 @@ pushd "${TEST_DATA}" > /dev/null 2>&1
 # NOTE: The -subj "/C=US/ST=CA/CN=test" clause ends up creating a certificate
 #       with only few fields (countryName, stateOrProvinceName, commonName) populated.
 #
-# This is why in the pytest we have the following to denote the 'CN=test'
-# fragment specifying the commonName: COMMON_NAME_FIELD = 2
+# The pytest checks for the 'CN=test' fragment specifying the commonName,
+# using: SELF_SIGNED_CERT_COMMON_NAME = 'test'
+
+# NOTE: The pytest restricts SSL connections to TLS 1.3, which signs handshakes
+#       only with RSA-PSS, ECDSA or EdDSA signature schemes; the RSA keys
+#       generated here are used with RSA-PSS. Independently of TLS version,
+#       OpenSSL's default security level rejects RSA keys under 2048 bits,
+#       so keep keys at 2048 bits or larger (openssl's default).
 
 # Parametrize based on openssl version to use -nodes or -noenc
 # In more current OpenSSL v3.0 and later, use -noenc.
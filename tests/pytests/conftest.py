@@ -0,0 +1,66 @@
+# #####################################################################################
+# Copyright (c) 2021-23, VMware Inc, and the Certifier Authors.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ##############################################################################
+"""
+Shared pytest fixtures.
+
+SSLContext objects used by the mTLS client-server tests are built once per
+test session, and re-used across test cases. This avoids re-loading default
+CA certs and re-parsing cert / key files for each test case, and lets
+repeated connections using the same context resume the TLS session.
+"""
+import pytest
+
+from .mtls_helpers import (setup_server_self_signed_ssl_context,
+                           setup_client_self_signed_ssl_context,
+                           setup_server_ssl_context,
+                           setup_client_ssl_context,
+                           setup_server_listener_socket)
+
+# ##############################################################################
+@pytest.fixture(scope='session')
+def server_self_signed_ctx():
+    """SSLContext for server using a self-signed cert."""
+    return setup_server_self_signed_ssl_context()
+
+# ##############################################################################
+@pytest.fixture(scope='session')
+def client_self_signed_ctx():
+    """SSLContext for client using a self-signed cert."""
+    return setup_client_self_signed_ssl_context()
+
+# ##############################################################################
+@pytest.fixture(scope='session')
+def server_root_signed_ctx():
+    """SSLContext for server using a cert signed by a root CA."""
+    return setup_server_ssl_context()
+
+# ##############################################################################
+@pytest.fixture(scope='session')
+def client_root_signed_ctx():
+    """SSLContext for client using a cert signed by a root CA."""
+    return setup_client_ssl_context()
+
+# ##############################################################################
+@pytest.fixture
+def mtls_listener():
+    """
+    (socket, port): Server socket listening for clients on an ephemeral port.
+    A new socket is created for each test case, so that a server thread left
+    blocked in accept() by a failed test cannot take the next test's client.
+    """
+    bindsocket = setup_server_listener_socket()
+    yield bindsocket, bindsocket.getsockname()[1]
+    bindsocket.close()
@@ -0,0 +1,151 @@
+# #####################################################################################
+# Copyright (c) 2021-23, VMware Inc, and the Certifier Authors.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ##############################################################################
+"""
+Helper methods shared by the mTLS client-server tests, in
+test_client_server_mtls.py, and the fixtures in conftest.py, to setup
+SSL contexts and server sockets. These only need Python's ssl and socket
+modules.
+"""
+import os
+import socket
+import ssl
+
+# Resolves to current tests/pytests dir
+THIS_SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+
+SERVER_HOST = '127.0.0.1'
+
+# Max time, in seconds, to wait for client / server sides of a test to finish.
+CLIENT_SERVER_COMM_TIMEOUT_SECS = 10
+
+# These certificate *.pem and private-key *.key files are generated by
+# the openssl utility.
+SERVER_SELF_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/server.public-cert.pem'
+SERVER_SELF_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/server-private.key'
+CLIENT_SELF_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/client.public-cert.pem'
+CLIENT_SELF_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/client-private.key'
+
+ROOT_POLICY_CERT        = THIS_SCRIPT_DIR + '/data/rootCA.cert'
+WRONG_ROOT_POLICY_CERT  = THIS_SCRIPT_DIR + '/data/wrong-rootCA.cert'
+SERVER_ROOT_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/server-mydomain.com.cert'
+SERVER_ROOT_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/server-mydomain.com.key'
+CLIENT_ROOT_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/client-mydomain.com.cert'
+CLIENT_ROOT_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/client-mydomain.com.key'
+
+# ##############################################################################
+def enable_tls13_session_resumption(context):
+    """
+    Helper-method: Restrict SSL context to TLS 1.3 and keep session tickets
+    enabled. Re-connects using the same context can then resume the session
+    with an abbreviated PSK handshake, skipping certificate verification.
+    This also restricts the handshake to TLS 1.3's AEAD cipher suites.
+
+    NOTE: TLS 1.3 signs handshakes only with RSA-PSS, ECDSA or EdDSA, all
+    of which OpenSSL supports with the RSA keys generated by
+    gen_client_server_certs_key_files.sh. Separately, OpenSSL's default
+    security level requires RSA keys of 2048 bits or more, for any TLS version.
+    """
+    context.minimum_version = ssl.TLSVersion.TLSv1_3
+    context.options &= ~ssl.OP_NO_TICKET
+
+# ##############################################################################
+def setup_server_self_signed_ssl_context():
+    """
+    Helper-method: Setup an SSL context for server to use, with a self-signed
+    certificate. Client's self-signed certificate is the only trusted cert.
+    """
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.verify_mode = ssl.CERT_REQUIRED
+    enable_tls13_session_resumption(context)
+    context.load_cert_chain(certfile=SERVER_SELF_SIGNED_CERT, keyfile=SERVER_SELF_SIGNED_KEYF)
+    context.load_verify_locations(cafile=CLIENT_SELF_SIGNED_CERT)
+    return context
+
+# ##############################################################################
+def setup_client_self_signed_ssl_context():
+    """
+    Helper-method: Setup an SSL context for client to use, with a self-signed
+    certificate. Server's self-signed certificate is the only trusted cert.
+    """
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.verify_mode = ssl.CERT_REQUIRED
+    enable_tls13_session_resumption(context)
+    context.load_cert_chain(certfile=CLIENT_SELF_SIGNED_CERT, keyfile=CLIENT_SELF_SIGNED_KEYF)
+    context.load_verify_locations(cafile=SERVER_SELF_SIGNED_CERT)
+    return context
+
+# ##############################################################################
+def setup_server_ssl_context(server_pvt_key_file:str = None):
+    """
+    Helper-method: Setup an SSL context for server to use.
+    Load certificate and private-key to install SSL certificate chains and
+    verify v/s root-policy certificate.
+
+    server_pvt_key_file: Some test-case passes-in a private-key written to
+    a temp file.
+    """
+    # Server needs to authenticate the client; hence 'Purpose.CLIENT_AUTH'
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.verify_mode = ssl.CERT_REQUIRED
+    enable_tls13_session_resumption(context)
+
+    if server_pvt_key_file is None:
+        server_pvt_key_file = SERVER_ROOT_SIGNED_KEYF
+
+    context.load_cert_chain(certfile=SERVER_ROOT_SIGNED_CERT, keyfile=server_pvt_key_file)
+    context.load_verify_locations(cafile=ROOT_POLICY_CERT)
+    return context
+
+# ##############################################################################
+def setup_client_ssl_context(client_pvt_key_file:str = None):
+    """
+    Helper-method: Setup an SSL context for client to use.
+    Load certificate and private-key to install SSL certificate chains and
+    verify v/s root-policy certificate.
+
+    client_pvt_key_file: Some test-case passes-in a private-key written to
+    a temp file.
+    """
+    # Client needs to authenticate the server; hence 'Purpose.SERVER_AUTH'
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.verify_mode = ssl.CERT_REQUIRED
+    enable_tls13_session_resumption(context)
+
+    if client_pvt_key_file is None:
+        client_pvt_key_file = CLIENT_ROOT_SIGNED_KEYF
+
+    context.load_cert_chain(certfile=CLIENT_ROOT_SIGNED_CERT, keyfile=client_pvt_key_file)
+    context.load_verify_locations(cafile=ROOT_POLICY_CERT)
+    return context
+
+# ##############################################################################
+def setup_server_listener_socket(timeout:float = CLIENT_SERVER_COMM_TIMEOUT_SECS):
+    """
+    Helper-method: Return a socket listening for clients on an ephemeral port,
+    so that test runs do not collide on a port left in TIME_WAIT.
+    """
+    bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    bindsocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    bindsocket.bind((SERVER_HOST, 0))
+    bindsocket.listen(10)
+
+    # Linux: Wake up from accept() only once the ClientHello has arrived.
+    if hasattr(socket, 'TCP_DEFER_ACCEPT'):
+        bindsocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, 1)
+
+    # Do not block forever in accept() if the client fails to connect
+    bindsocket.settimeout(timeout)
+    return bindsocket
@@ -21,131 +21,71 @@ communication using mTLS.
 import os
 import socket
 import ssl
+import select
 import pprint
+import functools
+import hashlib
+import threading
 from tempfile import TemporaryDirectory, NamedTemporaryFile
 
 # pylint: disable-next=line-too-long
-from OpenSSL.crypto import X509Store, X509StoreContext, load_certificate, FILETYPE_PEM, X509StoreContextError
+from OpenSSL.crypto import X509Store, X509StoreContext, load_certificate, FILETYPE_ASN1, FILETYPE_PEM, X509StoreContextError
 
 
 # pylint: enable=line-too-long
 
-# Resolves to current tests/pytests dir
-THIS_SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+from .mtls_helpers import (SERVER_HOST, CLIENT_SERVER_COMM_TIMEOUT_SECS,
+                           ROOT_POLICY_CERT, WRONG_ROOT_POLICY_CERT,
+                           SERVER_ROOT_SIGNED_CERT, SERVER_ROOT_SIGNED_KEYF,
+                           CLIENT_ROOT_SIGNED_CERT, CLIENT_ROOT_SIGNED_KEYF,
+                           setup_server_ssl_context, setup_client_ssl_context)
 
-SERVER_HOST = '127.0.0.1'
-SERVER_PORT = 1234
+# Pretty-printing peer certificates is expensive; do so only if requested.
+# To see this output, run: MTLS_TEST_VERBOSE=1 pytest --capture=tee-sys -v
+VERBOSE = os.environ.get('MTLS_TEST_VERBOSE', '0') == '1'
 
-# These certificate *.pem and private-key *.key files are generated by
-# the openssl utility.
-SERVER_SELF_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/server.public-cert.pem'
-SERVER_SELF_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/server-private.key'
-CLIENT_SELF_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/client.public-cert.pem'
-CLIENT_SELF_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/client-private.key'
+# TLS 1.3 only defines AEAD cipher suites (AES-GCM, ChaCha20-Poly1305), so
+# pinning the minimum protocol version to TLS 1.3 is sufficient to restrict
+# the negotiated cipher to these. (SSLContext.set_ciphers() only configures
+# TLS 1.2 and older cipher suites; it cannot be used to select these.)
+TLS13_AEAD_CIPHERS = [ 'TLS_AES_128_GCM_SHA256'
+                     , 'TLS_AES_256_GCM_SHA384'
+                     , 'TLS_CHACHA20_POLY1305_SHA256'
+                     ]
 
-# The openssl utility is invoked to specify few fields, where the
-# 'commonName' field is the 3rd field specified; Hence, offset=2
-# This hard-coded field-number arises from the way the openssl req
-# command is run in gen_client_server_certs_key_files.sh
-COMMON_NAME_FIELD = 2
+# Server prepends this header to the message received from client, and
+# returns it back to the client.
+RETURN_MSG_HDR = b'Return back to client: '
 
-ROOT_POLICY_CERT        = THIS_SCRIPT_DIR + '/data/rootCA.cert'
-WRONG_ROOT_POLICY_CERT  = THIS_SCRIPT_DIR + '/data/wrong-rootCA.cert'
-SERVER_ROOT_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/server-mydomain.com.cert'
-SERVER_ROOT_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/server-mydomain.com.key'
-CLIENT_ROOT_SIGNED_CERT = THIS_SCRIPT_DIR + '/data/client-mydomain.com.cert'
-CLIENT_ROOT_SIGNED_KEYF = THIS_SCRIPT_DIR + '/data/client-mydomain.com.key'
+# Max time, in seconds, to wait for data from peer on a non-blocking socket.
+SOCKET_RECV_TIMEOUT_SECS = 10
 
-# ##############################################################################
-# To see output, run: pytest --capture=tee-sys -v
-def test_server_process_with_mtls_self_signed_cert():
-    """
-    Run server-process that listens on an end-point on a secure SSL channel.
-    This exercises server process using a self-signed cert.
-    """
-    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    context.verify_mode = ssl.CERT_REQUIRED
-    context.load_cert_chain(certfile=SERVER_SELF_SIGNED_CERT, keyfile=SERVER_SELF_SIGNED_KEYF)
-    context.load_verify_locations(cafile=CLIENT_SELF_SIGNED_CERT)
-
-    bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    bindsocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    bindsocket.bind((SERVER_HOST, SERVER_PORT))
-    bindsocket.listen(10)
-    print('\nWaiting for client ...')
-
-    new_socket, fromaddr = bindsocket.accept()
-    print('\nClient connected: ', fromaddr[0], ":", fromaddr[1])
-
-    secure_sock = context.wrap_socket(new_socket, server_side=True)
-
-    print('\ngetpeername:', repr(secure_sock.getpeername()))
-    print('\nsecure socket cipher(): ', secure_sock.cipher())
-    print('\nPretty-print get peer Certificate:\n', pprint.pformat(secure_sock.getpeercert()))
-    cert = secure_sock.getpeercert()
-    print('\nPeer Certificate:', cert)
-
-    # Verify that client certificate was created as expected by the
-    # setup script,gen_client_server_certs_key_files.sh
-    if not cert or ('commonName', 'test') not in cert['subject'][COMMON_NAME_FIELD]:
-        raise Exception("ERROR")
+# The openssl utility is invoked, by gen_client_server_certs_key_files.sh,
+# to generate self-signed certs with this 'commonName' in the subject.
+SELF_SIGNED_CERT_COMMON_NAME = 'test'
 
-    try:
-        data = secure_sock.recv(1024)
-        print('\nReceived from client: ', str(data, 'UTF-8'))
-
-        ret_hdr = 'Return back to client: '
-        print('\nReturn message back to client:', ret_hdr + str(data, 'UTF-8'))
-        secure_sock.write(bytes(ret_hdr, 'UTF-8') +  data)
-    finally:
-        secure_sock.close()
-        bindsocket.close()
+# Verification verdicts of peer certificates, keyed by
+# (root-cert file, sha256 digest of peer's DER-cert).
+_VERIFIED_CERT_CACHE = {}
 
 # ##############################################################################
 # To see output, run: pytest --capture=tee-sys -v
-def test_client_app_with_mtls_self_signed_cert():
-    """
-    Run client-application that sends message via secure SSL channel.
-    This exercises a client process talking to a server using a self-signed cert.
+def test_mtls_self_signed(server_self_signed_ctx, client_self_signed_ctx):
     """
-    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-    context.verify_mode = ssl.CERT_REQUIRED
-    context.load_cert_chain(certfile=CLIENT_SELF_SIGNED_CERT, keyfile=CLIENT_SELF_SIGNED_KEYF)
-    context.load_verify_locations(cafile=SERVER_SELF_SIGNED_CERT)
-
-    bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    bindsocket.setblocking(1)
-    bindsocket.connect((SERVER_HOST, SERVER_PORT))
+    Run server and client-application, concurrently, that exchange a message
+    via secure SSL channel. This exercises a client talking to a server, where
+    both use a self-signed cert.
 
-    if ssl.HAS_SNI:
-        secure_sock = context.wrap_socket(bindsocket, server_side=False,
-                                          server_hostname=SERVER_HOST)
-    else:
-        secure_sock = context.wrap_socket(bindsocket, server_side=False)
-
-    cert = secure_sock.getpeercert()
-    print('\n\nPretty-print getpeercert() returned Certificate:\n', pprint.pformat(cert))
-    print(cert['subject'][COMMON_NAME_FIELD])
-
-    # Verify that server certificate was created as expected by the
-    # setup script,gen_client_server_certs_key_files.sh
-    if not cert or ('commonName', 'test') not in cert['subject'][COMMON_NAME_FIELD]:
-        raise Exception("ERROR")
-
-    send_msg = 'hello'
-    try:
-        secure_sock.send(bytes(send_msg, 'UTF-8'))
-
-        recv_data = secure_sock.recv(1024)
-        recv_data_str = str(recv_data, 'UTF-8')
-
-        print('\nReceived message from server:', recv_data_str)
-
-        # Server should have prepended this to our message and returned it
-        assert recv_data_str == 'Return back to client: ' + send_msg
-    finally:
-        secure_sock.close()
-        bindsocket.close()
+    The SSL channel runs over a connected socketpair(), bypassing the TCP/IP
+    stack, as this test does not exercise TCP connection setup.
+    """
+    server_socket, client_socket = setup_socketpair()
+    run_client_server_comm(
+        lambda: setup_server_self_signed_comm_with_client(server_self_signed_ctx,
+                                                          server_socket),
+        lambda: setup_client_self_signed_comm_with_server(client_self_signed_ctx,
+                                                          client_socket),
+        server_sock = server_socket)
 
 # ##############################################################################
 def test_verify_certs_versus_root_cert():
@@ -153,225 +93,402 @@ def test_verify_certs_versus_root_cert():
     Validate that the server / client certificates correctly verify v/s a valid
     root CA certificate, and correctly fail validation v/s an wrong root CA cert.
     """
-    result = verify_cert_file_vs_root_cert_file(ca_root_cert_location = ROOT_POLICY_CERT,
-                                                cert_location = SERVER_ROOT_SIGNED_CERT)
-    assert result is True
-
-    result = verify_cert_file_vs_root_cert_file(ca_root_cert_location = ROOT_POLICY_CERT,
-                                                cert_location = CLIENT_ROOT_SIGNED_CERT)
-    assert result is True
-
-    result = verify_cert_file_vs_root_cert_file(ca_root_cert_location = WRONG_ROOT_POLICY_CERT,
-                                                cert_location = SERVER_ROOT_SIGNED_CERT)
-    assert result is False
+    # (root CA cert, cert to verify, expected result)
+    cert_pairs = [ (ROOT_POLICY_CERT,       SERVER_ROOT_SIGNED_CERT, True)
+                 , (ROOT_POLICY_CERT,       CLIENT_ROOT_SIGNED_CERT, True)
+                 , (WRONG_ROOT_POLICY_CERT, SERVER_ROOT_SIGNED_CERT, False)
+                 , (WRONG_ROOT_POLICY_CERT, CLIENT_ROOT_SIGNED_CERT, False)
+                 ]
 
-    result = verify_cert_file_vs_root_cert_file(ca_root_cert_location = WRONG_ROOT_POLICY_CERT,
-                                                cert_location = CLIENT_ROOT_SIGNED_CERT)
-    assert result is False
+    results = verify_cert_files_vs_root_cert_files([ (root_cert, cert)
+                                                     for root_cert, cert, _ in cert_pairs])
+    assert results == [ expected for _, _, expected in cert_pairs ]
 
 # ##############################################################################
 # To see output, run: pytest --capture=tee-sys -v
-def test_server_process_with_mtls_root_signed_cert_and_pvt_key_file():
+def test_mtls_root_signed(mtls_listener, server_root_signed_ctx, client_root_signed_ctx):
     """
-    Run server-process that listens on an end-point on a secure SSL channel.
-    This exercises server process using a cert signed by a root CA.
-    """
-    context = setup_server_ssl_context()
-    setup_server_socket_comm_with_client(context)
+    Run server and client-application, concurrently, that exchange a message
+    via secure SSL channel. This exercises a client talking to a server, where
+    both use a cert generated and signed by a root CA.
 
-# ##############################################################################
-# To see output, run: pytest --capture=tee-sys -v
-def test_client_app_with_mtls_root_signed_cert_and_pvt_key_file():
-    """
-    Run client-application that sends message via secure SSL channel.
-    This exercises a client process talking to a server whose cert
-    was generated and signed by a root CA.
+    The client then re-connects, presenting the TLS session from the first
+    connection, to verify that the session is resumed.
+
+    The client connects to the server over TCP, on the mtls_listener socket.
     """
-    ssl_ctxt = setup_client_ssl_context()
-    setup_client_socket_comm_with_server(ssl_ctxt)
+    bindsocket, server_port = mtls_listener
+
+    def server_comm():
+        setup_server_socket_comm_with_client(server_root_signed_ctx,
+                                             accept_client(bindsocket))
+
+        # The context is shared by the session, so check the change in hits
+        hits = server_root_signed_ctx.session_stats()['hits']
+        setup_server_socket_comm_with_client(server_root_signed_ctx,
+                                             accept_client(bindsocket))
+        assert server_root_signed_ctx.session_stats()['hits'] == hits + 1
+
+    def client_comm():
+        session = setup_client_socket_comm_with_server(client_root_signed_ctx,
+                                                       connect_to_server(server_port))
+        setup_client_socket_comm_with_server(client_root_signed_ctx,
+                                             connect_to_server(server_port),
+                                             session = session)
 
+    run_client_server_comm(server_comm, client_comm, server_sock = bindsocket)
 
 # ##############################################################################
 # To see output, run: pytest --capture=tee-sys -v
-def test_server_process_with_mtls_root_signed_cert_using_temp_pvt_key_file():
+def test_mtls_root_signed_using_temp_pvt_key_file():
     """
-    Run server-process that listens on an end-point on a secure SSL channel.
-    This exercises server process using a certificate signed by a root CA.
-
-    Identical to test_server_process_with_mtls_root_signed_cert(), but the
-    private-key file is written to a process-private temp file, to verify
+    Similar to test_mtls_root_signed(), but the server's and the client's
+    private-key files are written to process-private temp files, to verify
     that these methods work correctly using such temp-files as input.
 
+    The SSL channel runs over a connected socketpair(), bypassing the TCP/IP
+    stack, as this test does not exercise TCP connection setup.
+
     Ref: https://github.com/python/cpython/pull/2449#issuecomment-626305094
          gh-60691: allow certificates to be specified from memory #2449
     """
     with open(SERVER_ROOT_SIGNED_KEYF, 'rt', encoding='utf-8') as keyf:
-        private_key = keyf.read()
+        server_private_key = keyf.read()
+
+    with open(CLIENT_ROOT_SIGNED_KEYF, 'rt', encoding='utf-8') as keyf:
+        client_private_key = keyf.read()
 
     with TemporaryDirectory() as tempdir:
         with NamedTemporaryFile('wt', dir=tempdir) as temp_keyf:
-            temp_keyf.write(private_key)
+            temp_keyf.write(server_private_key)
             temp_keyf.flush()
 
             print(f"\nServer process' private-key file: {temp_keyf.name}")
-            ssl_ctxt = setup_server_ssl_context(temp_keyf.name)
-
-    setup_server_socket_comm_with_client(ssl_ctxt)
+            server_ssl_ctxt = setup_server_ssl_context(temp_keyf.name)
 
-# ##############################################################################
-# To see output, run: pytest --capture=tee-sys -v
-def test_client_app_with_mtls_root_signed_cert_using_temp_pvt_key_file():
-    """
-    Run client-application that sends message via secure SSL channel.
-    This exercises a client process talking to a server whose certificate
-    was generated and signed by a root CA.
-
-    Identical to test_client_app_with_mtls_root_signed_cert(), but the
-    private-key file is written to a process-private temp file, to verify
-    that these methods work correctly using such temp-files as input.
-    """
-    with open(CLIENT_ROOT_SIGNED_KEYF, 'rt', encoding='utf-8') as keyf:
-        private_key = keyf.read()
-
-    with TemporaryDirectory() as tempdir:
         with NamedTemporaryFile('wt', dir=tempdir) as temp_keyf:
-            temp_keyf.write(private_key)
+            temp_keyf.write(client_private_key)
             temp_keyf.flush()
 
             print(f"\nClient App's private-key file: {temp_keyf.name}")
-            ssl_ctxt = setup_client_ssl_context(temp_keyf.name)
-
-    setup_client_socket_comm_with_server(ssl_ctxt)
+            client_ssl_ctxt = setup_client_ssl_context(temp_keyf.name)
 
+    server_socket, client_socket = setup_socketpair()
+    run_client_server_comm(
+        lambda: setup_server_socket_comm_with_client(server_ssl_ctxt, server_socket),
+        lambda: setup_client_socket_comm_with_server(client_ssl_ctxt, client_socket),
+        server_sock = server_socket)
 
 # ##############################################################################
 # Helper methods:
 # ##############################################################################
 
 # ##############################################################################
-def setup_server_ssl_context(server_pvt_key_file:str = None):
+def run_client_server_comm(server_comm, client_comm, server_sock = None,
+                           timeout:float = CLIENT_SERVER_COMM_TIMEOUT_SECS):
+    """
+    Helper-method: Run the server and client sides of a test case concurrently.
+     - server_comm() serves the client(s). This runs in a separate thread, so
+       a blocking accept() and the server-side handshake are off the main
+       test thread.
+     - client_comm() talks with the server. This runs on the main test thread.
+     - server_sock is the socket the server blocks on: the listening socket, or
+       the server's end of a socketpair. If the client fails, it is shut down
+       so that the server does not sit waiting for a client that never comes.
+
+    Exceptions raised by either side are re-raised here. If the client fails,
+    its exception is raised, unless the server had already failed: that is the
+    likely root cause, so the server's exception is raised, chained from the
+    client's. Server errors raised later, e.g. due to the shutdown, are added
+    as notes to the client's exception.
     """
-    Helper-method: Setup an SSL context for server to use.
-    Load certificate and private-key to install SSL certificate chains and
-    verify v/s root-policy certificate.
+    server_errors = []
 
-    server_pvt_key_file: Some test-case passes-in a private-key written to
-    a temp file.
+    def run_server():
+        try:
+            server_comm()
+        except Exception as exc:    # pylint: disable=broad-exception-caught
+            server_errors.append(exc)
+
+    # Daemon thread, so that a server stuck in accept() cannot hang pytest
+    server_thread = threading.Thread(target=run_server, daemon=True)
+    server_thread.start()
+
+    try:
+        client_comm()
+    except Exception as client_exc:
+        # Snapshot server errors raised before the client failed, then unblock
+        # the server so that the join below does not wait out the timeout.
+        prior_server_errors = list(server_errors)
+        if server_sock is not None:
+            try:
+                server_sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        server_thread.join(timeout)
+
+        if prior_server_errors:
+            raise prior_server_errors[0] from client_exc
+
+        if hasattr(client_exc, 'add_note'):
+            for server_exc in server_errors:
+                client_exc.add_note(f'Server also failed: {server_exc!r}')
+        raise
+
+    server_thread.join(timeout)
+    assert server_thread.is_alive() is False
+    if server_errors:
+        raise server_errors[0]
+
+# ##############################################################################
+def accept_client(bindsocket):
+    """
+    Helper-method: Accept a client's TCP connection on listening socket
+    'bindsocket', and return the new socket connected to the client.
     """
-    # Server needs to authenticate the client; hence 'Purpose.CLIENT_AUTH'
-    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    context.verify_mode = ssl.CERT_REQUIRED
+    print('\nWaiting for client on port', bindsocket.getsockname()[1], '...')
+    new_socket, fromaddr = bindsocket.accept()
+    enable_tcp_nodelay(new_socket)
+    print('\nClient connected: ', fromaddr[0], ":", fromaddr[1])
+    return new_socket
 
-    if server_pvt_key_file is None:
-        server_pvt_key_file = SERVER_ROOT_SIGNED_KEYF
+# ##############################################################################
+def connect_to_server(server_port:int):
+    """
+    Helper-method: Return a new socket connected, over TCP, to the server
+    listening on 'server_port'.
+    """
+    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    enable_tcp_nodelay(client_socket)
 
-    context.load_cert_chain(certfile=SERVER_ROOT_SIGNED_CERT, keyfile=server_pvt_key_file)
-    context.load_verify_locations(cafile=ROOT_POLICY_CERT)
-    return context
+    # Do not block forever if the server fails to respond
+    client_socket.settimeout(CLIENT_SERVER_COMM_TIMEOUT_SECS)
+    client_socket.connect((SERVER_HOST, server_port))
+    return client_socket
 
 # ##############################################################################
-def setup_client_ssl_context(client_pvt_key_file:str = None):
+def setup_socketpair():
     """
-    Helper-method: Setup an SSL context for client to use.
-    Load certificate and private-key to install SSL certificate chains and
-    verify v/s root-policy certificate.
+    Helper-method: Return (server socket, client socket) pair of connected
+    sockets, bypassing the TCP/IP stack. Use this for tests that do not need
+    to exercise TCP connection setup.
+    """
+    server_socket, client_socket = socket.socketpair()
+
+    # Do not block forever if either side fails to respond
+    server_socket.settimeout(CLIENT_SERVER_COMM_TIMEOUT_SECS)
+    client_socket.settimeout(CLIENT_SERVER_COMM_TIMEOUT_SECS)
+    return server_socket, client_socket
 
-    client_pvt_key_file: Some test-case passes-in a private-key written to
-    a temp file.
+# ##############################################################################
+def setup_server_self_signed_comm_with_client(ssl_ctxt, new_socket):
+    """
+    Work-horse method to setup secure communication channel with client,
+    where both use a self-signed certificate.
+     - Wrap socket 'new_socket', connected to client, using SSLContext 'ssl_ctxt'
+     - Verify client's certificate was created as expected
+     - Exchange simple "Hello" message with client.
     """
-    # Client needs to authenticate the server; hence 'Purpose.SERVER_AUTH'
-    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-    context.verify_mode = ssl.CERT_REQUIRED
+    secure_sock = ssl_ctxt.wrap_socket(new_socket, server_side=True)
 
-    if client_pvt_key_file is None:
-        client_pvt_key_file = CLIENT_ROOT_SIGNED_KEYF
+    print('\ngetpeername:', repr(secure_sock.getpeername()))
+    print('\nsecure socket cipher(): ', secure_sock.cipher())
+    cert = secure_sock.getpeercert()
+    if VERBOSE:
+        print('\nPretty-print get peer Certificate:\n', pprint.pformat(cert))
 
-    context.load_cert_chain(certfile=CLIENT_ROOT_SIGNED_CERT, keyfile=client_pvt_key_file)
-    context.load_verify_locations(cafile=ROOT_POLICY_CERT)
-    return context
+    try:
+        # Verify that client certificate was created as expected by the
+        # setup script,gen_client_server_certs_key_files.sh
+        if not cert or common_name_of(cert) != SELF_SIGNED_CERT_COMMON_NAME:
+            raise Exception("ERROR")
+
+        data = recv_from_secure_socket(secure_sock)
+        secure_sock.sendall(RETURN_MSG_HDR + data)
+    finally:
+        if VERBOSE:
+            print('\nServer session stats:', ssl_ctxt.session_stats())
+        secure_sock.close()
 
 # ##############################################################################
-def setup_server_socket_comm_with_client(ssl_ctxt):
+def setup_client_self_signed_comm_with_server(ssl_ctxt, client_socket):
+    """
+    Work-horse method to setup secure communication channel with server,
+    where both use a self-signed certificate.
+     - Wrap socket 'client_socket', connected to server, using SSLContext 'ssl_ctxt'
+     - Verify server's certificate was created as expected
+     - Exchange simple "Hello" message with server.
+     - Verify that server returns expected message.
+    """
+    if ssl.HAS_SNI:
+        secure_sock = ssl_ctxt.wrap_socket(client_socket, server_side=False,
+                                           server_hostname=SERVER_HOST)
+    else:
+        secure_sock = ssl_ctxt.wrap_socket(client_socket, server_side=False)
+
+    cert = secure_sock.getpeercert()
+    if VERBOSE:
+        print('\n\nPretty-print getpeercert() returned Certificate:\n', pprint.pformat(cert))
+    print('\nPeer Certificate commonName:', common_name_of(cert))
+
+    send_msg = 'hello'
+    try:
+        # Verify that server certificate was created as expected by the
+        # setup script,gen_client_server_certs_key_files.sh
+        if not cert or common_name_of(cert) != SELF_SIGNED_CERT_COMMON_NAME:
+            raise Exception("ERROR")
+
+        check_tls13_aead_cipher(secure_sock)
+        secure_sock.send(bytes(send_msg, 'UTF-8'))
+
+        recv_data = secure_sock.recv(1024)
+        recv_data_str = str(recv_data, 'UTF-8')
+
+        print('\nReceived message from server:', recv_data_str)
+
+        # Server should have prepended this to our message and returned it
+        assert recv_data_str == str(RETURN_MSG_HDR, 'UTF-8') + send_msg
+    finally:
+        secure_sock.close()
+        client_socket.close()
+
+# ##############################################################################
+def setup_server_socket_comm_with_client(ssl_ctxt, new_socket):
 
     """
     Work-horse method to setup secure communication channel with client.
-     - Listen for client on a new socket, using SSLContext 'ssl_ctxt'
+     - Wrap socket 'new_socket', connected to client, using SSLContext 'ssl_ctxt'
      - Verify client's certificate v/s root-policy certificate
      - Exchange simple "Hello" message with client.
     """
-    bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    bindsocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    bindsocket.bind((SERVER_HOST, SERVER_PORT))
-    bindsocket.listen(10)
-    print('\nWaiting for client ...')
-
-    new_socket, fromaddr = bindsocket.accept()
-    print('\nClient connected: ', fromaddr[0], ":", fromaddr[1])
-
     secure_sock = ssl_ctxt.wrap_socket(new_socket, server_side=True)
 
     print('\ngetpeername:', repr(secure_sock.getpeername()))
     print('\nsecure socket cipher(): ', secure_sock.cipher())
 
-    peer_cert = secure_sock.getpeercert()
-    print('\nPretty-print client peer Certificate:\n', pprint.pformat(peer_cert))
-
-    peer_pem_cert = ssl.DER_cert_to_PEM_cert(secure_sock.getpeercert(True))
-    peer_x509_cert = load_certificate(FILETYPE_PEM, peer_pem_cert.encode())
-    with open(ROOT_POLICY_CERT, encoding='utf-8') as root_cert_file:
-        root_x509_cert = load_certificate(FILETYPE_PEM, root_cert_file.read())
+    if VERBOSE:
+        print('\nPretty-print client peer Certificate:\n',
+              pprint.pformat(secure_sock.getpeercert()))
 
-    # Verify that client certificate was signed by root CA
-    if verify_certificate_vs_root_cert(ca_root_cert = root_x509_cert,
-                                       untrusted_cert = peer_x509_cert) is False:
-        raise Exception('Error: Client cert failed verification v/s root-cert')
     try:
-        data = secure_sock.recv(1024)
-        print('\nReceived from client: ', str(data, 'UTF-8'))
+        # Verify that client certificate was signed by root CA
+        if verify_der_cert_vs_root_cert_file(ca_root_cert_location = ROOT_POLICY_CERT,
+                                             der_cert = secure_sock.getpeercert(True)) is False:
+            raise Exception('Error: Client cert failed verification v/s root-cert')
 
-        ret_hdr = 'Return back to client: '
-        print('\nReturn message back to client:', ret_hdr + str(data, 'UTF-8'))
-        secure_sock.write(bytes(ret_hdr, 'UTF-8') +  data)
+        data = recv_from_secure_socket(secure_sock)
+        secure_sock.sendall(RETURN_MSG_HDR + data)
 
     finally:
+        if VERBOSE:
+            print('\nServer session stats:', ssl_ctxt.session_stats())
         secure_sock.close()
-        bindsocket.close()
 
 # ##############################################################################
-def setup_client_socket_comm_with_server(ssl_ctxt):
+def common_name_of(cert:dict):
+    """
+    Helper-method: Return the 'commonName' from the subject of a certificate,
+    as returned by getpeercert(), independent of the order of its RDNs.
+    """
+    return dict(rdn[0] for rdn in cert['subject']).get('commonName')
+
+# ##############################################################################
+def check_tls13_aead_cipher(secure_sock):
+    """
+    Helper-method: Verify that the connection negotiated TLS 1.3, using one
+    of the AEAD cipher suites.
+    """
+    print('\nsecure socket version(): ', secure_sock.version())
+    assert secure_sock.version() == 'TLSv1.3'
+    assert secure_sock.cipher()[0] in TLS13_AEAD_CIPHERS
+
+# ##############################################################################
+def enable_tcp_nodelay(sock):
+    """
+    Helper-method: Disable Nagle's algorithm on socket, so that the short
+    TLS records exchanged by the tests are not held back waiting for an ACK.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+# ##############################################################################
+def enable_tcp_quickack(sock):
+    """
+    Helper-method: Linux-only; ACK received data immediately instead of
+    delaying the ACK. The kernel clears this setting, so re-enable it after
+    each read.
+    """
+    if hasattr(socket, 'TCP_QUICKACK') and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+# ##############################################################################
+def recv_from_secure_socket(secure_sock, bufsize:int = 1024,
+                            timeout:float = SOCKET_RECV_TIMEOUT_SECS):
+    """
+    Helper-method: Read up to 'bufsize' bytes from an SSL-wrapped socket.
+    The SSL socket itself is switched to non-blocking mode, and select() is
+    used to wait for the TLS record(s) to arrive, which may be delivered in
+    multiple TCP segments. Socket's prior timeout / blocking mode is restored
+    on return.
+    """
+    prev_timeout = secure_sock.gettimeout()
+    secure_sock.setblocking(False)
+    try:
+        while True:
+            try:
+                data = secure_sock.recv(bufsize)
+                enable_tcp_quickack(secure_sock)
+                return data
+            except ssl.SSLWantReadError:
+                ready = select.select([secure_sock], [], [], timeout)[0]
+            except ssl.SSLWantWriteError:
+                ready = select.select([], [secure_sock], [], timeout)[1]
+
+            if not ready:
+                raise TimeoutError(f'No data received from peer in {timeout} secs')
+    finally:
+        secure_sock.settimeout(prev_timeout)
+
+# ##############################################################################
+def setup_client_socket_comm_with_server(ssl_ctxt, client_socket,
+                                         session:ssl.SSLSession = None):
 
     """
     Work-horse method to setup secure communication channel with server.
-     - Open a socket on server's host/port, using SSLContext 'ssl_ctxt'
+     - Wrap socket 'client_socket', connected to server, using SSLContext 'ssl_ctxt'
      - Verify server's certificate v/s root-policy certificate
      - Exchange simple "Hello" message with server.
      - Verify that server returns expected message.
-    """
-    bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    bindsocket.setblocking(1)
-    bindsocket.connect((SERVER_HOST, SERVER_PORT))
 
+    session: TLS session, from an earlier connection to this server, to resume.
+    Verifies that the session was actually resumed, if one is provided.
+
+    Returns the TLS session established with the server, which can be passed-in
+    to resume this session on a later connection.
+    """
     if ssl.HAS_SNI:
-        secure_sock = ssl_ctxt.wrap_socket(bindsocket, server_side=False,
-                                           server_hostname=SERVER_HOST)
+        secure_sock = ssl_ctxt.wrap_socket(client_socket, server_side=False,
+                                           server_hostname=SERVER_HOST,
+                                           session=session)
     else:
-        secure_sock = ssl_ctxt.wrap_socket(bindsocket, server_side=False)
+        secure_sock = ssl_ctxt.wrap_socket(client_socket, server_side=False,
+                                           session=session)
 
-    peer_cert = secure_sock.getpeercert()
-    print('\n\nPretty-print server peer Certificate:\n', pprint.pformat(peer_cert))
-
-    peer_pem_cert = ssl.DER_cert_to_PEM_cert(secure_sock.getpeercert(True))
-    peer_x509_cert = load_certificate(FILETYPE_PEM, peer_pem_cert.encode())
-    with open(ROOT_POLICY_CERT, encoding='utf-8') as root_cert_file:
-        root_x509_cert = load_certificate(FILETYPE_PEM, root_cert_file.read())
-
-    # Verify that server certificate was signed by root CA
-    if verify_certificate_vs_root_cert(ca_root_cert = root_x509_cert,
-                                       untrusted_cert = peer_x509_cert) is False:
-        raise Exception('Error: Server cert failed verification v/s root-cert')
+    if VERBOSE:
+        print('\n\nPretty-print server peer Certificate:\n',
+              pprint.pformat(secure_sock.getpeercert()))
 
     send_msg = 'hello'
     try:
+        # Verify that server certificate was signed by root CA
+        if verify_der_cert_vs_root_cert_file(ca_root_cert_location = ROOT_POLICY_CERT,
+                                             der_cert = secure_sock.getpeercert(True)) is False:
+            raise Exception('Error: Server cert failed verification v/s root-cert')
+
+        check_tls13_aead_cipher(secure_sock)
+        if session is not None:
+            print('\nTLS session reused:', secure_sock.session_reused)
+            assert secure_sock.session_reused is True
+
         secure_sock.send(bytes(send_msg, 'UTF-8'))
 
         recv_data = secure_sock.recv(1024)
@@ -380,39 +497,95 @@ def setup_client_socket_comm_with_server(ssl_ctxt):
         print('\nReceived message from server:', recv_data_str)
 
         # Server should have prepended this to our message and returned it
-        assert recv_data_str == 'Return back to client: ' + send_msg
+        assert recv_data_str == str(RETURN_MSG_HDR, 'UTF-8') + send_msg
+
+        # TLS 1.3 session tickets arrive after the handshake; so fetch the
+        # session only after having received data from the server.
+        return secure_sock.session
 
     finally:
         secure_sock.close()
-        bindsocket.close()
+        client_socket.close()
 
 
 # pylint: disable-next=line-too-long
 # Ref: https://stackoverflow.com/questions/30700348/how-to-validate-verify-an-x509-certificate-chain-of-trust-in-python
 # ##############################################################################
-def verify_cert_file_vs_root_cert_file(ca_root_cert_location:str, cert_location:str):
+def verify_cert_files_vs_root_cert_files(cert_pairs:list):
     """
-    Helper method to validate that a certificate being examined is valid
-    w.r.t. the root CA certificate provided. (The certificate read from
-    input 'cert_location' should have been signed by the root CA at the
-    'ca_root_cert_location' file.)
+    Helper method to validate a batch of (root CA cert file, cert file) pairs,
+    returning the list of verification results, in order. Each distinct cert
+    file is read and parsed only once, and one X509Store is built per
+    distinct root CA cert file, irrespective of the number of pairs.
     """
-    with open(ca_root_cert_location, encoding='utf-8') as root_cert_file:
-        root_cert = load_certificate(FILETYPE_PEM, root_cert_file.read())
+    untrusted_certs = {}
+    for _, cert_location in cert_pairs:
+        if cert_location not in untrusted_certs:
+            with open(cert_location, encoding='utf-8') as cert_file:
+                untrusted_certs[cert_location] = load_certificate(FILETYPE_PEM,
+                                                                  cert_file.read())
 
-    with open(cert_location, encoding='utf-8') as cert_file:
-        untrusted_cert = load_certificate(FILETYPE_PEM, cert_file.read())
+    return [ verify_certificate_vs_store(load_root_cert_store(ca_root_cert_location),
+                                         untrusted_certs[cert_location])
+             for ca_root_cert_location, cert_location in cert_pairs ]
 
-    return verify_certificate_vs_root_cert(root_cert, untrusted_cert)
+# ##############################################################################
+def verify_der_cert_vs_root_cert_file(ca_root_cert_location:str, der_cert:bytes):
+    """
+    Helper method to validate a peer's DER-format certificate, as returned by
+    getpeercert(True), w.r.t. the root CA certificate provided. The verdict is
+    cached against the sha256 digest of the DER-cert, so re-connects by the
+    same peer do not re-verify its certificate.
+    """
+    cache_key = (ca_root_cert_location, hashlib.sha256(der_cert).digest())
+    result = _VERIFIED_CERT_CACHE.get(cache_key)
+    if result is None:
+        # Parse DER-cert directly; no need to round-trip it through PEM.
+        peer_x509_cert = load_certificate(FILETYPE_ASN1, der_cert)
+        result = verify_certificate_vs_store(load_root_cert_store(ca_root_cert_location),
+                                             peer_x509_cert)
+        _VERIFIED_CERT_CACHE[cache_key] = result
+    return result
 
 # ##############################################################################
-def verify_certificate_vs_root_cert(ca_root_cert, untrusted_cert):
+@functools.lru_cache(maxsize=8)
+def load_root_cert(ca_root_cert_location:str):
     """
-    Verify untrusted cert v/s root certificate, both of which are expected
-    to be X509 format.
+    Load root CA certificate, in X509 format, from a PEM file. The parsed
+    certificate is cached, so each root-cert file is parsed only once.
+    """
+    with open(ca_root_cert_location, encoding='utf-8') as root_cert_file:
+        return load_certificate(FILETYPE_PEM, root_cert_file.read())
+
+# ##############################################################################
+@functools.lru_cache(maxsize=8)
+def load_root_cert_store(ca_root_cert_location:str):
+    """
+    Return an X509Store holding the root CA certificate read from the PEM file.
+    The store is built once per root-cert file and re-used across verifications.
+    """
+    return build_root_cert_store(load_root_cert(ca_root_cert_location))
+
+# ##############################################################################
+def build_root_cert_store(ca_root_cert):
+    """
+    Return a new X509Store holding the root CA certificate, in X509 format.
     """
     store = X509Store()
     store.add_cert(ca_root_cert)
+    return store
+
+# ##############################################################################
+def verify_certificate_vs_store(store, untrusted_cert):
+    """
+    Verify untrusted cert, in X509 format, v/s the root certificate(s) already
+    added to X509Store 'store'.
+
+    NOTE: cryptography's x509.verification.PolicyBuilder() is not used here as
+    it enforces the CA/Browser Forum profile, and rejects the X509v1 client
+    certificate generated by gen_client_server_certs_key_files.sh. Verification
+    through X509StoreContext is a single X509_verify_cert() call into OpenSSL.
+    """
     store_ctx = X509StoreContext(store, untrusted_cert)
 
     try:
@@ -423,34 +596,6 @@ def verify_certificate_vs_root_cert(ca_root_cert, untrusted_cert):
         return False
     return False
 
-# ##############################################################################
-# Based on example 12 from:
-# https://python.hotexamples.com/examples/ssl/SSLContext/load_verify_locations/python-sslcontext-load_verify_locations-method-examples.html
-#
-def verify_certificate_vs_root_cert0(ca_root_cert_location, cert_location, key_location):
-    """Attempted version -- did not work ..."""
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-    ssl_context.load_verify_locations(ca_root_cert_location)
-    ssl_context.verify_mode = ssl.CERT_REQUIRED
-    ssl_context.load_cert_chain(certfile=cert_location, keyfile=key_location)
-
-    return ssl_context
-
-def verify_certificate_vs_root_cert2(ca_root_cert_location, cert_location, key_location):
-    """Attempted version -- did not work ..."""
-
-    ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
-                                             cafile = ca_root_cert_location)
-
-    # ssl_context.load_verify_locations(cafile=ca_root_cert_location)
-    ssl_context.verify_mode = ssl.CERT_REQUIRED
-    ssl_context.load_cert_chain(certfile=cert_location, keyfile=key_location)
-    # if ssl_context.validate_certificate(cert_location):
-    #     return ssl_context
-    # else:
-    #     return None
-    return ssl_context
-
 # pylint: disable=pointless-string-statement
 """
 References: